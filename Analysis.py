@@ -0,0 +1,177 @@
+from dataclasses import dataclass, field
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+	from .Lexer import Lexer
+
+@dataclass
+class SpecAnalysis:
+	#  True if after a single match lex can read an unbounded number of characters before rewinding
+	#  to it; lex is then quadratic on inputs that make this happen again after every token (like
+	#  'aaa..a' for the rules a and a*b), but not necessarily on the witness itself
+	unbounded_backtracking: bool
+	#  most characters lex reads after a match and reads again after rewinding to it, not counting the
+	#  character that stops the DFA (read again after every token, so 0 is "no backtracking"); lex reads at
+	#  most max_backtrack + 1 characters again per token, so at most (max_backtrack + 2) * len(word) in total
+	#  (None when unbounded)
+	max_backtrack: int | None
+	#  input with one long rescan: a match, then the characters read again (the cycle pumped when unbounded)
+	#  it ends with a character leading to the sink state when there is one, otherwise at the end of the input
+	#  (None when the lexer never backtracks)
+	witness: str | None
+	#  [(rule, rules that win instead of it)..] for the rules that can never produce a token
+	shadowed_rules: list[tuple[str, list[str]]] = field(default_factory=list)
+
+	def __str__(self) -> str:
+		lines = []
+		if self.unbounded_backtracking:
+			lines.append("unbounded backtracking, witness: " + repr(self.witness))
+		elif self.witness is not None:
+			lines.append("backtracking of at most " + str(self.max_backtrack) + " characters, witness: "
+							+ repr(self.witness))
+		else:
+			lines.append("no backtracking")
+		for name, winners in self.shadowed_rules:
+			if winners:
+				lines.append("rule " + name + " can never win, shadowed by " + ", ".join(winners))
+			else:
+				lines.append("rule " + name + " can never match")
+		return "\n".join(lines)
+
+
+def shortest_paths(lexer: 'Lexer', states: set | None = None, start=None) -> dict:
+	#  bfs from start (default: the initial state) through the given states (default: all but the sink)
+	#  returns the shortest input reaching every visited state
+	sink_state = frozenset()
+	alphabet = sorted(lexer.dfa.S)
+	start = lexer.dfa.q0 if start is None else start
+	paths = {start: ''}
+	processing = deque([start])
+	while processing:
+		current_state = processing.popleft()
+		for symbol in alphabet:
+			next_state = lexer.dfa.d.get((current_state, symbol))
+			if next_state is None or next_state == sink_state or next_state in paths:
+				continue
+			if states is not None and next_state not in states:
+				continue
+			paths[next_state] = paths[current_state] + symbol
+			processing.append(next_state)
+	return paths
+
+
+def entered_states(lexer: 'Lexer') -> set:
+	#  the states reached after reading at least one character (matching in the others is matching nothing)
+	paths = shortest_paths(lexer)
+	entered = set()
+	for state in paths:
+		for symbol in lexer.dfa.S:
+			entered.add(lexer.dfa.d.get((state, symbol)))
+	return entered
+
+
+def find_shadowed_rules(lexer: 'Lexer') -> list[tuple[str, list[str]]]:
+	#  a rule can produce a token only if it wins (first-rule-wins) in a state reached after at least one character
+	entered = entered_states(lexer)
+	accepting = [state for state in lexer.tokenTable if state in entered]
+	winning_rules = {lexer.tokenTable[state] for state in accepting}
+
+	shadowed_rules = []
+	for index, (name, dfa) in enumerate(lexer.dfasList):
+		if index in winning_rules:
+			continue
+		winners = {lexer.tokenTable[state] for state in accepting if index in lexer.acceptedRules(state)}
+		shadowed_rules.append((name, [lexer.dfasList[rule][0] for rule in sorted(winners)]))
+	return shadowed_rules
+
+
+def analyze_lexer(lexer: 'Lexer', repeat: int = 8) -> SpecAnalysis:
+	# lex rewinds to the last match when the DFA reaches the sink state or the end of the input, so the
+	# characters read after a match, through non accepting states, are read again, and a cycle of such
+	# states right after a match makes the rescan unbounded.
+	# A token attempt that fails before any match is not counted: lex stops on the first error, and the
+	# streaming methods (lexStream, lexWithRecovery, so Parser.parse too) remember the failed attempts,
+	# which makes them linear for every spec, error recovery included. So strict only rejects the specs
+	# for which lex itself can be quadratic.
+	sink_state = frozenset()
+	alphabet = sorted(lexer.dfa.S)
+	paths = shortest_paths(lexer)
+
+	#  step 1: the non accepting states, the transitions between them and how to leave them with a rewind:
+	#  a symbol leading to the sink state if there is one, otherwise the end of the input ('')
+	#  (the end of the input works from every state, so no state is left out)
+	pending = {state for state in paths if state not in lexer.tokenTable}
+	successors = {state: [] for state in pending}
+	breakers = {}
+	for state in pending:
+		breakers[state] = ''
+		for symbol in alphabet:
+			next_state = lexer.dfa.d.get((state, symbol))
+			if next_state == sink_state and breakers[state] == '':
+				breakers[state] = symbol
+			elif next_state in pending:
+				successors[state].append((symbol, next_state))
+
+	#  step 2: entries right after a match => (input up to the match + next symbol, state)
+	entered = entered_states(lexer)
+	accepting = sorted((state for state in lexer.tokenTable if state in entered and state in paths),
+						key=lambda state: (len(paths[state]), paths[state]))
+	entries = []
+	for state in accepting:
+		for symbol in alphabet:
+			next_state = lexer.dfa.d.get((state, symbol))
+			if next_state in pending:
+				entries.append((paths[state] + symbol, next_state))
+
+	#  step 3: iterative dfs over the non accepting states reachable from the entries, looking for a cycle
+	order = []			#  post order => reverse topological order when there is no cycle
+	visited = set()
+	for prefix, entry_state in entries:
+		if entry_state in visited:
+			continue
+		visited.add(entry_state)
+		stack = [(entry_state, iter(successors[entry_state]))]
+		on_stack = {entry_state}
+		while stack:
+			state, remaining = stack[-1]
+			advanced = False
+			for symbol, next_state in remaining:
+				if next_state in on_stack:
+					#  cycle found: pump it right after the match, then rewind, through the sink if possible
+					to_cycle = shortest_paths(lexer, pending, entry_state)[next_state]
+					exits = shortest_paths(lexer, pending, next_state)
+					cycle = exits[state] + symbol
+					exit_state = min(exits, key=lambda s: (breakers[s] == '', len(exits[s]), exits[s]))
+					witness = prefix + to_cycle + cycle * repeat + exits[exit_state] + breakers[exit_state]
+					return SpecAnalysis(unbounded_backtracking=True, max_backtrack=None, witness=witness,
+										shadowed_rules=find_shadowed_rules(lexer))
+				if next_state not in visited:
+					visited.add(next_state)
+					on_stack.add(next_state)
+					stack.append((next_state, iter(successors[next_state])))
+					advanced = True
+					break
+			if not advanced:
+				stack.pop()
+				on_stack.discard(state)
+				order.append(state)
+
+	#  step 4: no cycle => longest rescan (characters read before the one that stops the DFA) for every state
+	longest = {}
+	for state in order:
+		best = (0, breakers[state])
+		for symbol, next_state in successors[state]:
+			if next_state in longest and longest[next_state][0] + 1 > best[0]:
+				best = (longest[next_state][0] + 1, symbol + longest[next_state][1])
+		longest[state] = best
+
+	#  the symbol read right after the match (at the end of prefix) is counted too
+	worst = None
+	for prefix, entry_state in entries:
+		length, rescan = longest[entry_state]
+		if worst is None or length + 1 > worst[0]:
+			worst = (length + 1, prefix + rescan)
+
+	return SpecAnalysis(unbounded_backtracking=False, max_backtrack=worst[0] if worst else 0,
+						witness=worst[1] if worst else None, shadowed_rules=find_shadowed_rules(lexer))
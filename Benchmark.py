@@ -0,0 +1,106 @@
+from .Lexer import Lexer
+from .Parser import Parser
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+#  run with: python -m <package>.Benchmark
+
+
+def generate_spec(no_of_rules: int) -> list[tuple[str, str]]:
+	#  keywords and identifier-like rules, so every rule has a non trivial NFA
+	spec = [('SPACE', '\\ ', 'skip'), ('NEWLINE', '\n')]
+	for index in range(no_of_rules):
+		spec.append(('KW' + str(index), 'kw' + str(index) + '(_[a-z]+)?'))
+	spec.append(('ID', '[a-z][a-z0-9_]*'))
+	spec.append(('NUM', '[0-9]+'))
+	return spec
+
+
+def bench_build(no_of_rules: int, workers: int) -> float:
+	spec = generate_spec(no_of_rules)
+	start = time.perf_counter()
+	Lexer(spec, workers=workers)
+	return time.perf_counter() - start
+
+
+def bench_build_scaling() -> None:
+	#  serial build vs process pool builds with an increasing number of workers
+	#  2 workers are always measured; on a single cpu this only shows the process pool overhead
+	cpus = os.cpu_count() or 1
+	if cpus < 2:
+		print(f"only {cpus} cpu available: no scaling can be measured, the speedups show the pool overhead")
+	for no_of_rules in (50, 100, 200):
+		serial = bench_build(no_of_rules, 1)
+		print(f"build  rules={no_of_rules:4d} workers= 1  {serial:8.3f}s")
+		workers = 2
+		while workers <= max(cpus, 2):
+			duration = bench_build(no_of_rules, workers)
+			print(f"build  rules={no_of_rules:4d} workers={workers:2d}  {duration:8.3f}s  speedup={serial / duration:5.2f}x")
+			workers *= 2
+
+
+EXPRESSION_SPEC = [
+	('SPACE', '\\ ', 'skip'), ('NEWLINE', '\n', 'skip'), ('NUM', '[0-9]+'), ('ID', '[a-z]+'),
+	('PLUS', '\\+'), ('TIMES', '\\*'), ('LP', '\\('), ('RP', '\\)'), ('SEMI', ';'),
+]
+
+EXPRESSION_GRAMMAR = [
+	('program', 'program statement'), ('program', 'statement'),
+	('statement', 'expr SEMI'),
+	('expr', 'expr PLUS term'), ('expr', 'term'),
+	('term', 'term TIMES factor'), ('term', 'factor'),
+	('factor', 'NUM'), ('factor', 'ID'), ('factor', 'LP expr RP'),
+]
+
+
+def generate_expression(depth: int) -> str:
+	if depth == 0 or random.random() < 0.3:
+		return random.choice([str(random.randint(0, 999)), random.choice(['x', 'abc', 'total'])])
+	operator = random.choice([' + ', ' * '])
+	expression = generate_expression(depth - 1) + operator + generate_expression(depth - 1)
+	return '(' + expression + ')' if random.random() < 0.3 else expression
+
+
+def generate_program(size: int) -> str:
+	#  statements separated by newlines, until the input has about size characters
+	random.seed(size)
+	statements = []
+	length = 0
+	while length < size:
+		statement = generate_expression(6) + ';'
+		statements.append(statement)
+		length += len(statement) + 1
+	return '\n'.join(statements)
+
+
+def bench_parse_throughput() -> None:
+	#  lexing the whole input into a list vs pulling the tokens lazily, and parsing on top of the stream
+	#  with and without building the parse tree
+	lexer = Lexer(EXPRESSION_SPEC)
+	parser = Parser(EXPRESSION_GRAMMAR, lexer)
+	for size in (100_000, 1_000_000):
+		program = generate_program(size)
+		megabytes = len(program) / 1_000_000
+
+		for name, run in (('lex list  ', lambda: lexer.lex(program)),
+							('lex stream', lambda: sum(1 for token in lexer.lexStream(program))),
+							('parse     ', lambda: parser.parse(program)),
+							('parse cb  ', lambda: parser.parse(program, lambda nonterminal, children: None))):
+			tracemalloc.start()
+			start = time.perf_counter()
+			run()
+			duration = time.perf_counter() - start
+			peak = tracemalloc.get_traced_memory()[1]
+			tracemalloc.stop()
+			print(f"{name} size={len(program):8d}  {duration:8.3f}s  {megabytes / duration:6.2f} MB/s"
+					f"  peak={peak / 1_000_000:8.2f} MB")
+
+
+if __name__ == '__main__':
+	benchmarks = {'build': bench_build_scaling, 'parse': bench_parse_throughput}
+	for name in sys.argv[1:] or benchmarks:
+		benchmarks[name]()
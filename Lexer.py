@@ -1,58 +1,178 @@
-from .Regex import Regex, parse_regex
-from .NFA import NFA
-from functools import reduce
+from .Regex import parse_regex
+from .DFA import DFA
+from .Analysis import analyze_lexer
+from functools import partial
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
 
-EPSILON = ''  # this is how epsilon is represented by the checker in the transition function of NFAs
+SKIP_FLAGS = {'skip', 'ignore'}  # a third element of a spec entry that marks the rule as thrown away by lex
+
+def ruleRanges(regex: str) -> list[tuple[int, int]]:
+	#  code point ranges used by a single rule (module level, so it can be sent to the worker processes)
+	return parse_regex(regex).ranges()
+
+def compileRule(regex: str, classStarts: list[int] | None) -> DFA[int]:
+	#  build the minimal DFA of a single rule (module level, so it can be sent to the worker processes)
+	parsed = parse_regex(regex)
+	if classStarts is not None:
+		parsed = parsed.compress(classStarts)
+	dfa = parsed.thompson().subset_construction().minimize()
+
+	#  keep only the states that can still reach a final state, numbered in bfs order from the initial state
+	#  a missing transition means the rule can no longer match (it is dropped from the product states)
+	predecessors = {}
+	for (state, symbol), nextState in dfa.d.items():
+		predecessors.setdefault(nextState, set()).add(state)
+	live = set(dfa.F)
+	processing = deque(dfa.F)
+	while processing:
+		for previousState in predecessors.get(processing.popleft(), ()):
+			if previousState not in live:
+				live.add(previousState)
+				processing.append(previousState)
+
+	if dfa.q0 not in live:
+		return DFA(S=set(dfa.S), K=set(), q0=None, d={}, F=set())
+
+	alphabet = sorted(dfa.S)
+	numbers = {dfa.q0: 0}
+	transitions = {}
+	processing = deque([dfa.q0])
+	while processing:
+		state = processing.popleft()
+		for symbol in alphabet:
+			nextState = dfa.d.get((state, symbol))
+			if nextState not in live:
+				continue
+			if nextState not in numbers:
+				numbers[nextState] = len(numbers)
+				processing.append(nextState)
+			transitions[(numbers[state], symbol)] = numbers[nextState]
+
+	return DFA(S=set(dfa.S), K=set(numbers.values()), q0=0, d=transitions,
+				F={numbers[state] for state in dfa.F if state in numbers})
 
 class Lexer:
-	def __init__(self, spec: list[tuple[str, str]]) -> None:
-		#  save [(token1, its corresponding NFA1)..]
-		self.afnsList = []
-
-		#  handle the first NFA separately
-		firstName, firstRegex = spec[0]
-		previousNfa = parse_regex(firstRegex).thompson()
-		#  save (token1, NFA1)
-		self.afnsList.append((firstName, previousNfa))
-
-		newInitialState = 0
-
-		# process subsequent NFAs
-		for name, regex in spec[1:]:
-			# build the NFA for current regex
-			nextNfa = parse_regex(regex).thompson()
-			
-			# remap states of the next NFA
-			nextNfa = nextNfa.remap_states(lambda x: x + len(previousNfa.K))
-			
-			# store the token and its corresponding NFA
-			self.afnsList.append((name, nextNfa))
-
-			# combine transitions with epsilon transitions from initial state
-			combinedD = dict(previousNfa.d)
-			combinedD.update(nextNfa.d)
-			if (newInitialState, EPSILON) in combinedD:
-				combinedD[(newInitialState, EPSILON)] |= {previousNfa.q0, nextNfa.q0}
-			else:
-				combinedD[(newInitialState, EPSILON)] = {previousNfa.q0, nextNfa.q0}
+	def __init__(self, spec: list[tuple[str, str] | tuple[str, str, str]], compressRanges: bool = False,
+				workers: int = 1, strict: bool = False) -> None:
+		#  save [(token1, its corresponding minimal DFA1)..]
+		self.dfasList = []
 
-			# combine all elements and update the previous NFA
-			previousNfa = NFA(S=previousNfa.S | nextNfa.S, K=previousNfa.K | nextNfa.K | {newInitialState},
-								q0=newInitialState, d=combinedD, F=previousNfa.F | nextNfa.F)
+		#  indexes of the rules marked as skip/ignore => consumed by lex without emitting a token
+		self.skipRules = set()
+		for index, entry in enumerate(spec):
+			if len(entry) > 2:
+				if entry[2] not in SKIP_FLAGS:
+					raise ValueError("Unknown flag " + repr(entry[2]) + " for token " + entry[0])
+				self.skipRules.add(index)
+
+		#  compile every rule to its minimal DFA (parse, thompson, subset construction, minimization),
+		#  in a process pool when workers > 1; map keeps the spec order, so the result is the same as serially
+		regexes = [entry[1] for entry in spec]
+		if workers > 1 and len(regexes) > 1:
+			chunkSize = max(1, len(regexes) // (4 * workers))
+			with ProcessPoolExecutor(max_workers=workers) as executor:
+				dfas = self.compileRules(regexes, compressRanges, partial(executor.map, chunksize=chunkSize))
+		else:
+			dfas = self.compileRules(regexes, compressRanges, map)
+
+		for entry, dfa in zip(spec, dfas):
+			self.dfasList.append((entry[0], dfa))
+
+		#  combine the rule DFAs into one DFA
+		self.dfa = self.productConstruction()
+
+		#  precompute the winning rule for every DFA state, so lex does not search the rules for each character
+		self.tokenTable = self.buildTokenTable()
+
+		#  reject, at build time, the specs for which lex can rescan an unbounded number of characters
+		if strict:
+			analysis = analyze_lexer(self)
+			if analysis.unbounded_backtracking:
+				raise ValueError("Lexer spec allows unbounded backtracking, witness: " + repr(analysis.witness))
+
+	def compileRules(self, regexes: list[str], compressRanges: bool, mapRules: Callable) -> list[DFA[int]]:
+		#  range mode: split the code points into classes that no regex can tell apart, so the automata
+		#  get one transition per class instead of one per code point (needed for large unicode ranges)
+		#  the ranges of the rules are collected with mapRules too, so only their union is computed here
+		self.classStarts = None
+		if compressRanges:
+			self.classStarts = self.buildClassStarts(mapRules(ruleRanges, regexes))
+
+		return list(mapRules(compileRule, regexes, [self.classStarts] * len(regexes)))
+
+	def productConstruction(self) -> DFA[frozenset[tuple[int, int]]]:
+		# run all the rule DFAs in parallel: a state is the set of (rule index, state of the rule DFA) pairs
+		# of the rules that can still match, so frozenset() is the sink state, like in subset_construction
+		sinkState = frozenset()
+		alphabet = set()
+		for name, dfa in self.dfasList:
+			alphabet |= dfa.S
+
+		#  outgoing transitions of every rule state, so a product state only looks at what its rules can read
+		outgoing = []
+		for name, dfa in self.dfasList:
+			edges = {}
+			for (state, symbol), nextState in dfa.d.items():
+				edges.setdefault(state, []).append((symbol, nextState))
+			outgoing.append(edges)
+
+		initialState = frozenset((index, dfa.q0) for index, (name, dfa) in enumerate(self.dfasList)
+								if dfa.q0 is not None)
+		states = {initialState, sinkState}
+		transitions = {(sinkState, symbol): sinkState for symbol in alphabet}
+
+		#  bfs over the reachable product states
+		processing = deque([initialState])
+		while processing:
+			current = processing.popleft()
+
+			reachable = {}
+			for index, state in current:
+				for symbol, nextState in outgoing[index].get(state, ()):
+					reachable.setdefault(symbol, set()).add((index, nextState))
+
+			for symbol in alphabet:
+				nextState = frozenset(reachable[symbol]) if symbol in reachable else sinkState
+				transitions[(current, symbol)] = nextState
+				if nextState not in states:
+					states.add(nextState)
+					processing.append(nextState)
+
+		finalStates = {state for state in states if self.acceptedRules(state)}
+		return DFA(S=alphabet, K=states, q0=initialState, d=transitions, F=finalStates)
+
+	def acceptedRules(self, state: frozenset[tuple[int, int]]) -> list[int]:
+		#  indexes (in spec order) of the rules whose DFA is in a final state in the given product state
+		return sorted(index for index, ruleState in state if ruleState in self.dfasList[index][1].F)
+
+	def buildClassStarts(self, rangesList: Iterable[list[tuple[int, int]]]) -> list[int]:
+		#  every range [low, high] used by a regex starts a class at low and another one right after high,
+		#  the first code point of each class is used as the symbol of the whole class
+		classStarts = {0}
+		for ranges in rangesList:
+			for low, high in ranges:
+				classStarts.add(low)
+				classStarts.add(high + 1)
+		return sorted(classStarts)
+
+	def buildTokenTable(self) -> dict[frozenset[tuple[int, int]], int]:
+		#  map each accepting DFA state to the index of the first rule (in spec order) that it accepts
+		tokenTable = {}
+		for state in self.dfa.F:
+			tokenTable[state] = self.acceptedRules(state)[0]
+		return tokenTable
+
+	def errorMessage(self, word: str, index: int) -> str:
+		#  error at the character at index (or at EOF), with the line counted from 0 and the column from 1
+		line = word.count('\n', 0, index)
+		if index >= len(word):
+			return "No viable alternative at character EOF, line " + str(line)
+		column = index - word.rfind('\n', 0, index)
+		return "No viable alternative at character " + str(column) + ", line " + str(line)
 
-		# store the final combined NFA
-		self.nfa = previousNfa
-		
-		# convert NFA to DFA
-		self.dfa = self.nfa.subset_construction()
-
-	def findMatchingToken(self, matchState, start, end, word):
-		for name, nfa in self.afnsList:   				#  parse NFAs
-			for finalState in nfa.F:       				#  for each NFA, parse its final states
-				if finalState in set(matchState):  		#  check if a final state is in the set states of the DFA
-					return (name, word[start:end])		#  return the first pair (token, matched_string) 
-		return None										#  didn't find a corresponding match token
-	
 	def lex(self, word: str) -> list[tuple[str, str]] | None:
 		# this method splits the lexer indto tokens based on the specification and the rules described in the lecture
 		# the result is a list of tokens in the form (TOKEN_NAME:MATCHED_STRING)
@@ -61,10 +181,11 @@ class Lexer:
 		
 		#  save the resulted tokens
 		tokens = []
-		
-		#  error handling
-		noOfLines = 0    			#  line where the error occured
-		errorPos = 0	 			#  the column where the error occured	
+
+		#  local lookups for the hot loop
+		tokenTable = self.tokenTable
+		skipRules = self.skipRules
+		classStarts = self.classStarts
 	
 		# state tracking
 		currentState = self.dfa.q0  
@@ -80,10 +201,9 @@ class Lexer:
 		while i < len(word):
 			letter = word[i]
 
-			if letter == '\n':
-				noOfLines += 1	
-				errorPos = -1		
-			errorPos += 1
+			#  in range mode, the DFA works on the class of the letter (the first code point of the class)
+			if classStarts is not None:
+				letter = chr(classStarts[bisect_right(classStarts, ord(letter)) - 1])
 
 			#  try current transition if it exists
 			if (currentState, letter) in self.dfa.d:
@@ -92,14 +212,12 @@ class Lexer:
 				prevState = currentState
 				currentState = currentTrans
 
-				token = self.findMatchingToken(prevState, lastMatchEnd, i, word)
-
-				if token:
+				if prevState in tokenTable:
 					lastRuleState = prevState  #  last state where it was a match
 					lastRuleMatchPos = i       #  last position where it was a match
 			else:
 				#  if there is no possible transition over letter => letter is not in the alphabet
-				return [("", "No viable alternative at character " + str(errorPos) + ", line " + str(noOfLines))]
+				return [("", self.errorMessage(word, i))]
 
 			#  check if there is a sink state
 			#  if yes, go back to the previous state that was a matching state which should be final
@@ -107,20 +225,21 @@ class Lexer:
 				#  a lexing error was found if there is no previous state
 				#  I am at the final of the word and there is no matching pattern
 				if prevState == None:
-					return [("", "No viable alternative at character EOF, line " + str(noOfLines))]
+					return [("", self.errorMessage(word, len(word)))]
 				
 				if lastMatchEnd == lastRuleMatchPos:  #  there is no character in a match => eliminate the possibility of cicles 
-					return [("", "No viable alternative at character " + str(errorPos) + ", line " + str(noOfLines))]
+					return [("", self.errorMessage(word, i))]
 				
 				#  take the first rule with which there is a match
-				token = self.findMatchingToken(lastRuleState, lastMatchEnd, lastRuleMatchPos, word)
+				rule = tokenTable.get(lastRuleState)
 
-				#  save the result 
-				if token:
-					tokens.append(token)
+				#  save the result (skipped rules are consumed without building the token)
+				if rule is not None:
+					if rule not in skipRules:
+						tokens.append((self.dfasList[rule][0], word[lastMatchEnd:lastRuleMatchPos]))
 					lastMatchEnd = lastRuleMatchPos
 				else:
-					return [("", "No viable alternative at character " + str(errorPos) + ", line " + str(noOfLines))]
+					return [("", self.errorMessage(word, i))]
 
 				#  reset the DFA
 				prevState = None
@@ -129,27 +248,116 @@ class Lexer:
 				i = lastMatchEnd - 1
 				
 			i += 1
+
+			#  the word is finished without a match, but there was one before => go back to it, like on the sink state
+			if i == len(word) and currentState not in tokenTable and lastMatchEnd < lastRuleMatchPos:
+				rule = tokenTable[lastRuleState]
+				if rule not in skipRules:
+					tokens.append((self.dfasList[rule][0], word[lastMatchEnd:lastRuleMatchPos]))
+				lastMatchEnd = lastRuleMatchPos
+
+				prevState = None
+				currentState = self.dfa.q0
+				i = lastMatchEnd
 		
 		#  a+ (regex), aaa (input)=> in case the word is finished before making a match => check the final match 
-		token = self.findMatchingToken(currentState, lastMatchEnd, len(word), word)
-		if token:
-			lastRuleState = currentState
-			lastRuleMatchPos = len(word)
-
-		if currentState == frozenset():
-			if prevState == None:
-				return [("", "No viable alternative at character EOF, line " + str(noOfLines))]
-			token = self.findMatchingToken(lastRuleState, lastMatchEnd, len(word), word)
-			if token:
-				tokens.append(token)
-			else:
-				return [("", "No viable alternative at character EOF, line " + str(noOfLines))]
-		
-		else: 
-			token = self.findMatchingToken(lastRuleState, lastMatchEnd, len(word), word)
-			if token:
-				tokens.append(token)
-			else:
-				return [("", "No viable alternative at character EOF, line " + str(noOfLines))]
+		rule = tokenTable.get(currentState)
+		if rule is None:
+			return [("", self.errorMessage(word, len(word)))]
+		if rule not in skipRules:
+			tokens.append((self.dfasList[rule][0], word[lastMatchEnd:len(word)]))
 
 		return tokens
+
+	def lexWithRecovery(self, word: str) -> tuple[list[tuple[str, str]], list[tuple[int, int, int, str]]]:
+		# maximal munch / first-match-wins like lex, but a lexing error does not abort the whole input:
+		# the error is recorded as (offset, line, column, message), the offending character is skipped and
+		# lexing resumes right after it (see lexStream for the differences from lex)
+		errors = []
+		tokens = list(self.lexStream(word, errors))
+		return tokens, errors
+
+	def lexStream(self, word: str, errors: list[tuple[int, int, int, str]] | None = None,
+				position: list[int] | None = None) -> Iterator[tuple[str, str]]:
+		# generator version of the lexer: the tokens are produced one by one, while the caller consumes them
+		# without errors list, the first lexing error is produced as ("", message) and the generator stops
+		# with an errors list, the errors are recorded there and lexing goes on (see lexWithRecovery)
+		# with a position list, it holds [offset, line, column] of the last produced token (see Parser.parse)
+
+		# differences from lex:
+		#  - an empty input produces no tokens and no error (lex returns an EOF error)
+		#  - an error is reported at the character where the failed token starts, never at EOF (lex reports
+		#    it where the DFA failed); both count the column from 1 on its line and the line from 0
+		#  - on a character outside the alphabet, the lexer rewinds to the last match like on the sink state
+		#    and at the end of the input (lex returns an error)
+		#  - the (state, offset) pairs reached after the last match of a token attempt are remembered as failed,
+		#    since no rule can match from them, and a later attempt that reaches one of them stops there; so
+		#    every pair is explored at most once and lexing (error recovery included) reads O(len(K) * len(word))
+		#    characters, linear in the input for every spec (lex rescans them, see analyze_lexer)
+
+		#  local lookups for the hot loop
+		transitions = self.dfa.d
+		tokenTable = self.tokenTable
+		skipRules = self.skipRules
+		classStarts = self.classStarts
+		initialState = self.dfa.q0
+		sinkState = frozenset()
+
+		#  position tracking for the error messages
+		line = 0
+		lineStart = 0
+
+		#  (state, offset) pairs from which no rule can match anymore
+		failed = set()
+
+		start = 0
+		while start < len(word):
+			#  run the DFA from start for as long as possible, remembering the longest match
+			currentState = initialState
+			lastRule = None
+			lastMatchEnd = start
+			pending = []		#  pairs reached after the last match
+			i = start
+			while i < len(word):
+				letter = word[i]
+				if classStarts is not None:
+					letter = chr(classStarts[bisect_right(classStarts, ord(letter)) - 1])
+				currentState = transitions.get((currentState, letter))
+				if currentState is None or currentState == sinkState:
+					break
+				i += 1
+				rule = tokenTable.get(currentState)
+				if rule is not None:
+					lastRule = rule
+					lastMatchEnd = i
+					if pending:
+						pending.clear()
+				elif (currentState, i) in failed:
+					break
+				else:
+					pending.append((currentState, i))
+			failed.update(pending)
+
+			if lastRule is None:
+				#  no rule matches a non-empty prefix => record the error and resynchronize on the next character
+				column = start - lineStart + 1
+				message = "No viable alternative at character " + str(column) + ", line " + str(line)
+				if errors is None:
+					yield ("", message)
+					return
+				errors.append((start, line, column, message))
+				end = start + 1
+			else:
+				if lastRule not in skipRules:
+					if position is not None:
+						position[:] = (start, line, start - lineStart + 1)
+					yield (self.dfasList[lastRule][0], word[start:lastMatchEnd])
+				end = lastMatchEnd
+
+			#  update the line tracking over the consumed characters
+			newLines = word.count('\n', start, end)
+			if newLines:
+				line += newLines
+				lineStart = word.rfind('\n', start, end) + 1
+
+			start = end
@@ -3,10 +3,273 @@ from .NFA import NFA
 from .Regex import Regex, parse_regex
 from .Lexer import Lexer
 
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+import pickle
+
+END = '$'           # end of input marker in the parse tables
+START = "S'"        # start symbol of the augmented grammar (S' -> S)
+PROPAGATE = None    # placeholder lookahead used to find the propagated LALR(1) lookaheads
+
+#  node of the parse tree, the leaves are the (TOKEN_NAME, MATCHED_STRING) pairs produced by the lexer
+@dataclass
+class ParseTree:
+    symbol: str
+    children: list['ParseTree | tuple[str, str]'] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        #  iterative, so that deep trees (long left recursive lists) do not hit the recursion limit
+        parts = []
+        processing = [self]
+        while processing:
+            item = processing.pop()
+            if isinstance(item, str):
+                parts.append(item)
+            elif isinstance(item, ParseTree):
+                parts.append(item.symbol + "(")
+                processing.append(")")
+                for index in reversed(range(len(item.children))):
+                    processing.append(item.children[index])
+                    if index > 0:
+                        processing.append(" ")
+            else:
+                parts.append(item[0] + ":" + repr(item[1]))
+        return "".join(parts)
+
 class Parser():
-    def __init__(self, input: str) -> None:
-        pass
-    
-    def parse(self, input: str) -> None:
-        # this method should parse the input string and print the result of the parsing process
-        pass
\ No newline at end of file
+    def __init__(self, grammar: list[tuple[str, str]], lexer: Lexer) -> None:
+        # the grammar is a list of productions (NONTERMINAL, "space separated symbols of the right hand side"),
+        # an empty right hand side is an epsilon production and the first nonterminal is the start symbol
+        # every symbol that is not a nonterminal must be a token name of the lexer
+
+        self.lexer = lexer
+
+        if not grammar:
+            raise ValueError("Empty grammar")
+
+        #  augment the grammar with S' -> S, so that accepting is a reduction by production 0
+        self.productions = [(START, (grammar[0][0],))]
+        for nonterminal, rhs in grammar:
+            self.productions.append((nonterminal, tuple(rhs.split())))
+
+        self.nonterminals = {nonterminal for nonterminal, rhs in self.productions}
+        self.terminals = {symbol for _, rhs in self.productions for symbol in rhs if symbol not in self.nonterminals}
+
+        #  the skipped tokens are never produced by the lexer, so the grammar cannot use them
+        tokenNames = {name for index, (name, dfa) in enumerate(lexer.dfasList) if index not in lexer.skipRules}
+        skippedTokens = {lexer.dfasList[index][0] for index in lexer.skipRules} - tokenNames
+        if self.terminals & skippedTokens:
+            raise ValueError("Skipped tokens in grammar: " + ", ".join(sorted(self.terminals & skippedTokens)))
+        unknownTokens = self.terminals - tokenNames
+        if unknownTokens:
+            raise ValueError("Unknown tokens in grammar: " + ", ".join(sorted(unknownTokens)))
+
+        #  productions of every nonterminal, in grammar order
+        self.byNonterminal = {nonterminal: [] for nonterminal in self.nonterminals}
+        for index, (nonterminal, rhs) in enumerate(self.productions):
+            self.byNonterminal[nonterminal].append(index)
+
+        self.computeFirst()
+
+        #  build the parse tables once: action[(state, TOKEN)] and goto[(state, NONTERMINAL)]
+        self.action, self.goto = self.buildTables()
+
+    def computeFirst(self) -> None:
+        #  nullable nonterminals and FIRST sets, iterated until nothing changes
+        self.nullable = set()
+        self.first = {nonterminal: set() for nonterminal in self.nonterminals}
+
+        changed = True
+        while changed:
+            changed = False
+            for nonterminal, rhs in self.productions:
+                before = (len(self.first[nonterminal]), nonterminal in self.nullable)
+                for symbol in rhs:
+                    if symbol in self.terminals:
+                        self.first[nonterminal].add(symbol)
+                        break
+                    self.first[nonterminal] |= self.first[symbol]
+                    if symbol not in self.nullable:
+                        break
+                else:
+                    self.nullable.add(nonterminal)
+                if before != (len(self.first[nonterminal]), nonterminal in self.nullable):
+                    changed = True
+
+    def firstOfSequence(self, symbols: tuple[str, ...], lookahead: str | None) -> set[str | None]:
+        #  FIRST(symbols lookahead)
+        result = set()
+        for symbol in symbols:
+            if symbol in self.terminals:
+                result.add(symbol)
+                return result
+            result |= self.first[symbol]
+            if symbol not in self.nullable:
+                return result
+        result.add(lookahead)
+        return result
+
+    def closure(self, items: set[tuple[int, int, str | None]]) -> set[tuple[int, int, str | None]]:
+        #  LR(1) closure of a set of items (production, dot position, lookahead)
+        result = set(items)
+        processing = list(items)
+        while processing:
+            production, dot, lookahead = processing.pop()
+            rhs = self.productions[production][1]
+            if dot < len(rhs) and rhs[dot] in self.nonterminals:
+                for symbol in self.firstOfSequence(rhs[dot + 1:], lookahead):
+                    for nextProduction in self.byNonterminal[rhs[dot]]:
+                        item = (nextProduction, 0, symbol)
+                        if item not in result:
+                            result.add(item)
+                            processing.append(item)
+        return result
+
+    def buildStates(self) -> tuple[list[frozenset[tuple[int, int]]], dict[tuple[int, str], int]]:
+        #  canonical collection of LR(0) item sets, each state is identified by its kernel items
+        kernels = [frozenset({(0, 0)})]
+        stateOf = {kernels[0]: 0}
+        transitions = {}
+
+        state = 0
+        while state < len(kernels):
+            items = self.closure({(production, dot, PROPAGATE) for production, dot in kernels[state]})
+
+            #  group the items by the symbol after the dot => kernel of the next state
+            nextKernels = {}
+            for production, dot, lookahead in items:
+                rhs = self.productions[production][1]
+                if dot < len(rhs):
+                    nextKernels.setdefault(rhs[dot], set()).add((production, dot + 1))
+
+            for symbol in sorted(nextKernels):
+                kernel = frozenset(nextKernels[symbol])
+                if kernel not in stateOf:
+                    stateOf[kernel] = len(kernels)
+                    kernels.append(kernel)
+                transitions[(state, symbol)] = stateOf[kernel]
+            state += 1
+
+        return kernels, transitions
+
+    def buildTables(self) -> tuple[dict[tuple[int, str], tuple], dict[tuple[int, str], int]]:
+        kernels, transitions = self.buildStates()
+
+        #  LALR(1) lookaheads of the kernel items: spontaneously generated ones + propagation between kernels
+        lookaheads = {(state, item): set() for state, kernel in enumerate(kernels) for item in kernel}
+        lookaheads[(0, (0, 0))].add(END)
+        propagation = {key: [] for key in lookaheads}
+
+        for state, kernel in enumerate(kernels):
+            for item in kernel:
+                for production, dot, lookahead in self.closure({(item[0], item[1], PROPAGATE)}):
+                    rhs = self.productions[production][1]
+                    if dot == len(rhs):
+                        continue
+                    target = (transitions[(state, rhs[dot])], (production, dot + 1))
+                    if lookahead is PROPAGATE:
+                        propagation[(state, item)].append(target)
+                    else:
+                        lookaheads[target].add(lookahead)
+
+        changed = True
+        while changed:
+            changed = False
+            for source, targets in propagation.items():
+                for target in targets:
+                    if not lookaheads[source] <= lookaheads[target]:
+                        lookaheads[target] |= lookaheads[source]
+                        changed = True
+
+        #  fill the tables, a conflict means the grammar is not LALR(1)
+        action = {}
+        goto = {}
+
+        def setAction(state, symbol, value):
+            if action.get((state, symbol), value) != value:
+                raise ValueError("Grammar is not LALR(1): conflict in state " + str(state) + " on " + symbol
+                                 + " between " + str(action[(state, symbol)]) + " and " + str(value))
+            action[(state, symbol)] = value
+
+        for (state, symbol), target in transitions.items():
+            if symbol in self.nonterminals:
+                goto[(state, symbol)] = target
+            else:
+                setAction(state, symbol, ('shift', target))
+
+        for state, kernel in enumerate(kernels):
+            items = self.closure({(production, dot, lookahead) for production, dot in kernel
+                                  for lookahead in lookaheads[(state, (production, dot))]})
+            for production, dot, lookahead in items:
+                if dot == len(self.productions[production][1]):
+                    if production == 0:
+                        setAction(state, END, ('accept',))
+                    else:
+                        setAction(state, lookahead, ('reduce', production))
+
+        return action, goto
+
+    def parse(self, input: str, onReduce: Callable[[str, list[Any]], Any] | None = None) -> Any:
+        # this method parses the input string and returns its parse tree
+        # the tokens are pulled one by one from the lexer, so the token list is never built
+
+        # with onReduce, no tree is built: every reduction calls onReduce(NONTERMINAL, children), where the
+        # children are the tokens and the values returned for the nonterminals of the right hand side, and
+        # parse returns the value of the start symbol; memory then only holds the values on the parse stack
+
+        action = self.action
+        goto = self.goto
+        productions = self.productions
+
+        #  [offset, line, column] of the current token, for the syntax errors
+        position = [0, 0, 1]
+        tokens = self.lexer.lexStream(input, position=position)
+        states = [0]
+        values = []
+
+        token = next(tokens, (END, ''))
+        while True:
+            name, lexeme = token
+            if name == "":
+                #  lexing error, the message is in place of the matched string
+                raise ValueError(lexeme)
+
+            step = action.get((states[-1], name))
+            if step is None:
+                #  same position format as the lexing errors
+                if name == END:
+                    raise ValueError("Syntax error: unexpected end of input at character EOF, line "
+                                     + str(input.count('\n')))
+                raise ValueError("Syntax error: unexpected " + name + " " + repr(lexeme) + " at character "
+                                 + str(position[2]) + ", line " + str(position[1]))
+
+            if step[0] == 'shift':
+                states.append(step[1])
+                values.append(token)
+                token = next(tokens, (END, ''))
+
+            elif step[0] == 'reduce':
+                nonterminal, rhs = productions[step[1]]
+                children = values[len(values) - len(rhs):]
+                del values[len(values) - len(rhs):]
+                del states[len(states) - len(rhs):]
+                if onReduce is None:
+                    values.append(ParseTree(nonterminal, children))
+                else:
+                    values.append(onReduce(nonterminal, children))
+                states.append(goto[(states[-1], nonterminal)])
+
+            else:
+                return values[0]
+
+    def save(self, path: str) -> None:
+        #  cache the parse tables (and the lexer they are built on) on disk
+        with open(path, 'wb') as file:
+            pickle.dump(self, file)
+
+    @staticmethod
+    def load(path: str) -> 'Parser':
+        #  load a parser saved with save, without building the lexer automata or the tables again
+        with open(path, 'rb') as file:
+            return pickle.load(file)
@@ -1,4 +1,5 @@
 from typing import Any, List
+from bisect import bisect_left, bisect_right
 from .NFA import NFA
 
 EPSILON = ''
@@ -12,6 +13,15 @@ class Regex:
     def thompson(self) -> NFA[int]:
         raise NotImplementedError('the thompson method of the Regex class should never be called')
 
+    #  returns the code point ranges (inclusive) of all the symbols used by the regular expression
+    def ranges(self) -> list[tuple[int, int]]:
+        return []
+
+    #  rewrites the regular expression over the alphabet classes starting at the given (sorted) code points
+    #  each class is represented by the symbol of its first code point
+    def compress(self, class_starts: list[int]) -> 'Regex':
+        return self
+
 #  represents a symbol in the regular expression
 class Symbol(Regex):
     def __init__(self, char: str):
@@ -22,6 +32,9 @@ class Symbol(Regex):
 
     def thompson(self) -> NFA[int]:
         return NFA(S={self.char}, K={1, 2}, q0=1, d={(1, self.char): {2}}, F={2})
+
+    def ranges(self) -> list[tuple[int, int]]:
+        return [(ord(self.char), ord(self.char))]
         
 #  represents the union of two regular expressions
 class Union(Regex):
@@ -31,6 +44,12 @@ class Union(Regex):
     def __str__(self) -> str:
         return "Union(" + ",".join(str(component) for component in self.components) + ")"
 
+    def ranges(self) -> list[tuple[int, int]]:
+        return [r for component in self.components for r in component.ranges()]
+
+    def compress(self, class_starts: list[int]) -> Regex:
+        return Union(*[component.compress(class_starts) for component in self.components])
+
     def thompson(self) -> NFA[int]:
         #  first NFA
         previous_nfa = self.components[0].thompson()
@@ -87,6 +106,12 @@ class Concat(Regex):
     def __str__(self) -> str:
         return "Concat(" + ",".join(str(component) for component in self.components) + ")"
 
+    def ranges(self) -> list[tuple[int, int]]:
+        return [r for component in self.components for r in component.ranges()]
+
+    def compress(self, class_starts: list[int]) -> Regex:
+        return Concat(*[component.compress(class_starts) for component in self.components])
+
     def thompson(self) -> NFA[int]:
         previous_nfa = self.components[0].thompson()
         
@@ -120,6 +145,12 @@ class Star(Regex):
     def __str__(self) -> str:
         return f"Star({self.regex})"
 
+    def ranges(self) -> list[tuple[int, int]]:
+        return self.regex.ranges()
+
+    def compress(self, class_starts: list[int]) -> Regex:
+        return Star(self.regex.compress(class_starts))
+
     def thompson(self) -> NFA[int]:
         inner_nfa = self.regex.thompson()
         #  update the states from the inner_dfa
@@ -147,39 +178,63 @@ class Star(Regex):
 
         return NFA(S=inner_nfa.S.copy(), K=inner_nfa.K, q0=new_initial_state, d=new_d, F={new_final_state})
 
-#  represents [A-Z] regular expression
-class Uppercase(Regex):
+#  represents a character class made of (inclusive) ranges, e.g. [a-zA-Z_] or [α-ω]
+class CharRange(Regex):
+    def __init__(self, *arg: tuple[str, str]):
+        self.char_ranges = arg
+
     def __str__(self) -> str:
-        return f"[A-Z]"
+        def escape(char):
+            return '\\' + char if char in '\\-]' else char
+        return "[" + "".join(escape(low) if low == high else escape(low) + "-" + escape(high)
+                             for low, high in self.char_ranges) + "]"
 
     def thompson(self) -> NFA[int]:
-        alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-        elements = [Symbol(letter) for letter in alphabet]
+        #  one transition per code point => only meant for small ranges, large ones should be compressed first
+        elements = [Symbol(chr(code)) for low, high in self.ranges() for code in range(low, high + 1)]
+        if len(elements) == 1:
+            return elements[0].thompson()
         regex = Union(*elements)
         return regex.thompson()
 
+    def ranges(self) -> list[tuple[int, int]]:
+        return [(ord(low), ord(high)) for low, high in self.char_ranges]
+
+    def compress(self, class_starts: list[int]) -> Regex:
+        #  a range always starts a class and the code point after it starts another one,
+        #  so the range is covered exactly by the classes starting inside it
+        elements = []
+        for low, high in self.ranges():
+            for start in class_starts[bisect_left(class_starts, low):bisect_right(class_starts, high)]:
+                elements.append(Symbol(chr(start)))
+        if len(elements) == 1:
+            return elements[0]
+        return Union(*elements)
+
+#  represents [A-Z] regular expression
+class Uppercase(CharRange):
+    def __init__(self):
+        super().__init__(('A', 'Z'))
+
+    def __str__(self) -> str:
+        return f"[A-Z]"
+
 #  represents [a-z] regular expression
-class Lowercase(Regex):
+class Lowercase(CharRange):
+    def __init__(self):
+        super().__init__(('a', 'z'))
+
     def __str__(self) -> str:
         return f"[a-z]"
 
-    def thompson(self) -> NFA[int]:
-        alphabet = "abcdefghijklmnopqrstuvwxyz"
-        elements = [Symbol(letter) for letter in alphabet]
-        regex = Union(*elements)
-        return regex.thompson()
-
 #  represents [0-9] regular expression
-class Digit(Regex):
+class Digit(CharRange):
+    def __init__(self):
+        super().__init__(('0', '9'))
+
     def __str__(self) -> str:
         return f"[0-9]"
 
-    def thompson(self) -> NFA[int]:
-        alphabet = "0123456789"
-        elements = [Symbol(digit) for digit in alphabet]
-        regex = Union(*elements)
-        return regex.thompson()
-
 #  represents Epsilon regular expression
 class Epsilon(Regex):
     def __str__ (self) -> str:
@@ -196,6 +251,12 @@ class Plus(Regex):
     def __str__(self) -> str:
         return f"Plus({str(self.regex)})"
 
+    def ranges(self) -> list[tuple[int, int]]:
+        return self.regex.ranges()
+
+    def compress(self, class_starts: list[int]) -> Regex:
+        return Plus(self.regex.compress(class_starts))
+
     def thompson(self) -> NFA[int]:
         #  A+ = AA*
         regex = Concat(self.regex, Star(self.regex))
@@ -209,6 +270,12 @@ class Question(Regex):
     def __str__(self) -> str:
         return f"Question({str(self.regex)})"
 
+    def ranges(self) -> list[tuple[int, int]]:
+        return self.regex.ranges()
+
+    def compress(self, class_starts: list[int]) -> Regex:
+        return Question(self.regex.compress(class_starts))
+
     def thompson(self) -> NFA[int]:
         #  A? = (EPSILON | A)
         regex = Union(Epsilon(), self.regex)
@@ -315,15 +382,38 @@ def parse_regex(regex: str) -> Regex:
 
         elif element == '[':  #  start of a character class
             j = i + 1
-            if regex[j:j + 3] == "a-z":
+            if regex[j:j + 4] == "a-z]":
                 stack.append(Lowercase())
                 j += 3
-            elif regex[j:j + 3] == "A-Z":
+            elif regex[j:j + 4] == "A-Z]":
                 stack.append(Uppercase())
                 j += 3
-            elif regex[j:j + 3] == "0-9":
+            elif regex[j:j + 4] == "0-9]":
                 stack.append(Digit())
                 j += 3
+            else:
+                #  general class: single characters and x-y ranges (any code points), '\\' escapes the next character
+                char_ranges = []
+                while j < len(regex) and regex[j] != ']':
+                    if regex[j] == '\\' and j + 1 < len(regex):
+                        j += 1
+                    low = regex[j]
+                    j += 1
+                    if j + 1 < len(regex) and regex[j] == '-' and regex[j + 1] != ']':
+                        if regex[j + 1] == '\\' and j + 2 < len(regex):
+                            j += 1
+                        char_ranges.append((low, regex[j + 1]))
+                        j += 2
+                    else:
+                        char_ranges.append((low, low))
+                if j >= len(regex):
+                    raise ValueError("Unterminated character class in regex " + repr(regex))
+                if not char_ranges:
+                    raise ValueError("Empty character class in regex " + repr(regex))
+                for low, high in char_ranges:
+                    if low > high:
+                        raise ValueError("Invalid range " + low + "-" + high + " in regex " + repr(regex))
+                stack.append(CharRange(*char_ranges))
             i = j  #  skip ']'
 
         else:
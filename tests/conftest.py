@@ -0,0 +1,12 @@
+import os
+import sys
+import types
+
+#  the modules of the repository use relative imports, so they are loaded as submodules of a package
+#  named lexer, whatever the name of the directory the repository is checked out in
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'lexer' not in sys.modules:
+	package = types.ModuleType('lexer')
+	package.__path__ = [ROOT]
+	sys.modules['lexer'] = package
@@ -0,0 +1,97 @@
+import pytest
+
+from lexer.Lexer import Lexer
+from lexer.Analysis import analyze_lexer
+
+
+class CountingTransitions(dict):
+	#  transition table that counts how many transitions the lexer takes
+	reads = 0
+
+	def get(self, key, default=None):
+		self.reads += 1
+		return super().get(key, default)
+
+	def __getitem__(self, key):
+		self.reads += 1
+		return super().__getitem__(key)
+
+
+def lex_reads(lexer, word):
+	lexer.dfa.d = CountingTransitions(lexer.dfa.d)
+	lexer.lex(word)
+	return lexer.dfa.d.reads
+
+
+def streaming_reads(lexer, word):
+	lexer.dfa.d = CountingTransitions(lexer.dfa.d)
+	list(lexer.lexStream(word))
+	return lexer.dfa.d.reads
+
+
+def test_rewind_at_end_of_input_is_unbounded_backtracking():
+	#  no symbol leads to the sink state after 'aa', but the lexer rewinds at the end of the input
+	spec = [('A', 'a'), ('AB', 'a*b')]
+	analysis = analyze_lexer(Lexer(spec))
+	assert analysis.unbounded_backtracking
+	assert analysis.max_backtrack is None
+	assert set(analysis.witness) == {'a'}
+
+	with pytest.raises(ValueError, match='unbounded backtracking'):
+		Lexer(spec, strict=True)
+
+	#  and lex really is quadratic on it, while the streaming lexer remembers the failed attempts
+	assert lex_reads(Lexer(spec), 'a' * 200) > 3 * lex_reads(Lexer(spec), 'a' * 100)
+	assert streaming_reads(Lexer(spec), 'a' * 200) <= 3 * 200
+
+
+def test_sink_symbol_is_preferred_in_the_witness():
+	analysis = analyze_lexer(Lexer([('SPACE', '\\ '), ('A', 'a'), ('AB', 'a*b')]))
+	assert analysis.unbounded_backtracking
+	assert analysis.witness.endswith(' ')
+
+
+def test_bounded_backtracking():
+	analysis = analyze_lexer(Lexer([('SPACE', '\\ '), ('A', 'a'), ('ABC', 'abc')]))
+	assert not analysis.unbounded_backtracking
+	assert analysis.max_backtrack == 1
+	assert analysis.witness == 'ab '
+
+
+def test_no_backtracking_and_shadowed_rules():
+	lexer = Lexer([('SPACE', '\\ ', 'skip'), ('ID', '[a-z]+'), ('IF', 'if'), ('NUM', '[0-9]+')], strict=True)
+	analysis = analyze_lexer(lexer)
+	assert not analysis.unbounded_backtracking
+	assert analysis.witness is None
+	assert analysis.shadowed_rules == [('IF', ['ID'])]
+	assert streaming_reads(lexer, 'ab ' * 200) <= 2 * len('ab ' * 200)
+
+
+@pytest.mark.parametrize('spec, word', [
+	([('A', 'a')], 'aa'),
+	([('SPACE', '\\ '), ('A', 'a'), ('ABC', 'abc')], None),
+	([('SPACE', '\\ '), ('A', 'a'), ('ABCD', 'abcd'), ('B', '[a-d]')], None),
+	([('SPACE', '\\ '), ('ID', '[a-z]+'), ('NUM', '[0-9]+')], 'ab 1'),
+])
+def test_max_backtrack_matches_the_transitions_taken(spec, word):
+	#  the first token of the witness is followed by max_backtrack characters and the one stopping the DFA
+	lexer = Lexer(spec)
+	analysis = analyze_lexer(lexer)
+	word = analysis.witness if word is None else word
+	lexer.dfa.d = CountingTransitions(lexer.dfa.d)
+	name, lexeme = next(lexer.lexStream(word))
+	assert lexer.dfa.d.reads == len(lexeme) + analysis.max_backtrack + 1
+
+	#  and lex reads at most (max_backtrack + 2) characters per character of the input
+	assert lex_reads(Lexer(spec), word * 50) <= (analysis.max_backtrack + 2) * len(word * 50)
+
+
+def test_failed_attempts_are_not_rescans():
+	#  no token can start on 'a', so lex stops at the first one and recovery remembers the failed attempt
+	spec = [('SPACE', '\\ ', 'skip'), ('R', '(a|c)*b'), ('B', 'b')]
+	lexer = Lexer(spec, strict=True)
+	assert not analyze_lexer(lexer).unbounded_backtracking
+	assert lex_reads(lexer, 'a' * 1000) <= 1000
+	lexer.dfa.d = CountingTransitions(lexer.dfa.d)
+	lexer.lexWithRecovery('a' * 1000)
+	assert lexer.dfa.d.reads <= 3 * 1000
@@ -0,0 +1,131 @@
+import pytest
+
+from lexer.Lexer import Lexer
+
+SPEC = [
+	('SPACE', '\\ ', 'skip'), ('NEWLINE', '\n'), ('IF', 'if'), ('ID', '[a-z]+'), ('NUM', '[0-9]+'),
+	('EQ', '='), ('EQEQ', '=='),
+]
+
+
+def test_first_rule_wins_and_maximal_munch():
+	lexer = Lexer(SPEC)
+	assert lexer.lex('if iff == 12\nx = 3') == [
+		('IF', 'if'), ('ID', 'iff'), ('EQEQ', '=='), ('NUM', '12'), ('NEWLINE', '\n'),
+		('ID', 'x'), ('EQ', '='), ('NUM', '3'),
+	]
+
+
+def test_parallel_build_matches_serial_build():
+	serial = Lexer(SPEC)
+	parallel = Lexer(SPEC, workers=2)
+	assert parallel.dfa == serial.dfa
+	assert parallel.tokenTable == serial.tokenTable
+	word = 'if x == 1\nifx = 22 if'
+	assert parallel.lex(word) == serial.lex(word)
+
+
+def test_rules_leave_the_product_state_when_they_can_no_longer_match():
+	lexer = Lexer([('A', 'a'), ('NONE', 'a*'), ('B', 'b')])
+	assert lexer.lex('ab') == [('A', 'a'), ('B', 'b')]
+	assert lexer.lex('aab') == [('NONE', 'aa'), ('B', 'b')]
+
+
+def test_lex_error_positions():
+	#  the column is counted from 1 on the line of the failing character, the line from 0
+	lexer = Lexer([('NEWLINE', '\n'), ('A', 'a'), ('ABC', 'abc'), ('C', 'c')])
+	assert lexer.lex('a\nac#') == [('', 'No viable alternative at character 3, line 1')]
+	#  after rewinding from 'aba' to 'a', the characters read again are not counted twice
+	assert lexer.lex('abac') == [('', 'No viable alternative at character 2, line 0')]
+	assert lexer.lex('a\nabac') == [('', 'No viable alternative at character 2, line 1')]
+	#  a newline that no rule matches is on the line it ends
+	assert Lexer([('A', 'a')]).lex('aa\n') == [('', 'No viable alternative at character 3, line 0')]
+
+
+class CountingWord(str):
+	#  input that counts the substrings taken from it
+	slices = 0
+
+	def __getitem__(self, key):
+		if isinstance(key, slice):
+			self.slices += 1
+		return super().__getitem__(key)
+
+
+class CountingTransitions(dict):
+	#  transition table that counts how many transitions the lexer takes
+	reads = 0
+
+	def get(self, key, default=None):
+		self.reads += 1
+		return super().get(key, default)
+
+
+def test_skip_and_ignore_rules():
+	lexer = Lexer([('SPACE', '\\ ', 'skip'), ('COMMENT', '#[a-z]*', 'ignore'), ('ID', '[a-z]+')])
+	assert lexer.skipRules == {0, 1}
+	assert lexer.lex('ab #note cd  #x') == [('ID', 'ab'), ('ID', 'cd')]
+	assert lexer.lex('  ') == []
+
+
+def test_unknown_flag():
+	with pytest.raises(ValueError, match="Unknown flag 'keep' for token SPACE"):
+		Lexer([('SPACE', '\\ ', 'keep'), ('ID', '[a-z]+')])
+
+
+def test_skipped_matches_build_no_substrings():
+	lexer = Lexer([('SPACE', '\\ +', 'skip'), ('ID', '[a-z]+')])
+	word = CountingWord('ab   c d  efg   ')
+	assert lexer.lex(word) == [('ID', 'ab'), ('ID', 'c'), ('ID', 'd'), ('ID', 'efg')]
+	assert word.slices == 4
+
+
+def test_skip_rule_at_the_end_of_the_input():
+	#  'a  ' ends in the middle of SPACEX, so lex goes back to the first space and then matches the second
+	lexer = Lexer([('ID', '[a-z]'), ('SPACE', '\\ ', 'skip'), ('SPACEX', '\\ \\ x')])
+	assert lexer.lex('a  ') == [('ID', 'a')]
+	assert lexer.lex('a  x ') == [('ID', 'a'), ('SPACEX', '  x')]
+
+
+def test_rewind_at_the_end_of_the_input():
+	#  the last token ends where its rule matched, not at the end of the input
+	lexer = Lexer([('A', 'a'), ('AB', 'a*b')])
+	assert lexer.lex('aa') == [('A', 'a'), ('A', 'a')]
+	assert lexer.lex('aa') == lexer.lexWithRecovery('aa')[0]
+	assert lexer.lex('aaba') == [('AB', 'aab'), ('A', 'a')]
+
+
+def test_recovery_errors():
+	lexer = Lexer(SPEC)
+	#  bad characters at the start, a run of them after a newline and one at the end
+	word = '#x = 1\ny @@@ 2\n=$'
+	tokens, errors = lexer.lexWithRecovery(word)
+	assert errors == [
+		(0, 0, 1, 'No viable alternative at character 1, line 0'),
+		(9, 1, 3, 'No viable alternative at character 3, line 1'),
+		(10, 1, 4, 'No viable alternative at character 4, line 1'),
+		(11, 1, 5, 'No viable alternative at character 5, line 1'),
+		(16, 2, 2, 'No viable alternative at character 2, line 2'),
+	]
+	#  between the errors, the tokens are the ones lex finds on the clean parts
+	assert tokens == lexer.lex('x = 1\ny ') + lexer.lex(' 2\n=')
+	assert lexer.lexWithRecovery('x = 1\ny') == (lexer.lex('x = 1\ny'), [])
+
+
+def test_recovery_is_linear():
+	#  no token can start on 'a', but every attempt reads the rest of the input looking for a 'b'
+	lexer = Lexer([('SPACE', '\\ ', 'skip'), ('R', '(a|c)*b'), ('B', 'b')])
+	lexer.dfa.d = CountingTransitions(lexer.dfa.d)
+	tokens, errors = lexer.lexWithRecovery('a' * 1000 + ' b')
+	assert tokens == [('R', 'b')]
+	assert [offset for offset, line, column, message in errors] == list(range(1000))
+	assert lexer.dfa.d.reads <= 3 * 1002
+
+
+def test_parallel_build_in_range_mode():
+	spec = [('SPACE', '\\ ', 'skip'), ('GREEK', '[α-ω]+'), ('ID', '[a-zα]+'), ('NUM', '[0-9]+')]
+	serial = Lexer(spec, compressRanges=True)
+	parallel = Lexer(spec, compressRanges=True, workers=2)
+	assert parallel.classStarts == serial.classStarts
+	assert parallel.dfa == serial.dfa
+	assert parallel.lex('αβ aα 12') == serial.lex('αβ aα 12') == [('GREEK', 'αβ'), ('ID', 'aα'), ('NUM', '12')]
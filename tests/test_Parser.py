@@ -0,0 +1,125 @@
+import pytest
+
+from lexer.Lexer import Lexer
+from lexer.Parser import END, ParseTree, Parser
+
+SPEC = [
+	('SPACE', '\\ ', 'skip'), ('NEWLINE', '\n', 'skip'), ('NUM', '[0-9]+'), ('ID', '[a-z]+'),
+	('PLUS', '\\+'), ('TIMES', '\\*'), ('LP', '\\('), ('RP', '\\)'), ('EQ', '='), ('SEMI', ';'),
+]
+
+EXPRESSIONS = [
+	('program', 'program statement'), ('program', 'statement'),
+	('statement', 'expr SEMI'),
+	('expr', 'expr PLUS term'), ('expr', 'term'),
+	('term', 'term TIMES factor'), ('term', 'factor'),
+	('factor', 'NUM'), ('factor', 'LP expr RP'),
+]
+
+
+@pytest.fixture(scope='module')
+def lexer():
+	return Lexer(SPEC)
+
+
+@pytest.fixture(scope='module')
+def parser(lexer):
+	return Parser(EXPRESSIONS, lexer)
+
+
+def test_tables(parser):
+	#  from the initial state, an expression starts with NUM or LP, and the tables accept after a program
+	assert parser.action[(0, 'NUM')][0] == 'shift'
+	assert parser.action[(0, 'LP')][0] == 'shift'
+	assert (0, 'PLUS') not in parser.action
+	assert parser.action[(parser.goto[(0, 'program')], END)] == ('accept',)
+	assert {symbol for state, symbol in parser.goto} == {'program', 'statement', 'expr', 'term', 'factor'}
+
+
+def test_parse_tree(parser):
+	tree = parser.parse('1 + 2 * (3);')
+	assert str(tree) == ("program(statement(expr(expr(term(factor(NUM:'1'))) PLUS:'+' term(term(factor(NUM:'2'))"
+							" TIMES:'*' factor(LP:'(' expr(term(factor(NUM:'3'))) RP:')'))) SEMI:';'))")
+
+
+def test_lalr_grammar_that_is_not_slr(lexer):
+	grammar = [('s', 'l EQ r'), ('s', 'r'), ('l', 'TIMES r'), ('l', 'ID'), ('r', 'l')]
+	tree = Parser(grammar, lexer).parse('*a = **b')
+	assert tree.symbol == 's'
+	assert [child[0] if isinstance(child, tuple) else child.symbol for child in tree.children] == ['l', 'EQ', 'r']
+
+
+def test_conflict(lexer):
+	with pytest.raises(ValueError, match='not LALR\\(1\\)'):
+		Parser([('e', 'e PLUS e'), ('e', 'NUM')], lexer)
+
+
+def test_unknown_token(lexer):
+	with pytest.raises(ValueError, match='Unknown tokens in grammar: FOO'):
+		Parser([('e', 'FOO')], lexer)
+
+
+def test_skipped_token(lexer):
+	#  the lexer never produces the skipped tokens
+	with pytest.raises(ValueError, match='Skipped tokens in grammar: NEWLINE, SPACE'):
+		Parser([('e', 'NUM SPACE NEWLINE')], lexer)
+
+
+def test_empty_grammar(lexer):
+	with pytest.raises(ValueError, match='Empty grammar'):
+		Parser([], lexer)
+
+
+def test_epsilon_productions(lexer):
+	parser = Parser([('list', 'list item'), ('list', ''), ('item', 'ID'), ('item', 'NUM')], lexer)
+	assert parser.parse('') == ParseTree('list', [])
+	assert str(parser.parse('a 1')) == "list(list(list() item(ID:'a')) item(NUM:'1'))"
+
+
+def test_save_and_load(parser, tmp_path):
+	path = tmp_path / 'parser.pickle'
+	parser.save(path)
+	loaded = Parser.load(path)
+	assert loaded.action == parser.action
+	assert loaded.goto == parser.goto
+	assert loaded.parse('(1 + 2) * 3;') == parser.parse('(1 + 2) * 3;')
+
+
+def test_reduce_callback(parser):
+	def evaluate(nonterminal, children):
+		#  the tokens are (NAME, MATCHED_STRING) pairs, the nonterminals are the values returned here
+		if nonterminal == 'program':
+			return [children[0]] if len(children) == 1 else children[0] + [children[1]]
+		if nonterminal == 'statement':
+			return children[0]
+		if len(children) == 3 and nonterminal == 'factor':
+			return children[1]
+		if len(children) == 3:
+			return children[0] + children[2] if nonterminal == 'expr' else children[0] * children[2]
+		if isinstance(children[0], tuple):
+			return int(children[0][1])
+		return children[0]
+
+	assert parser.parse('1 + 2 * (3 + 4);\n2 * 3;', evaluate) == [15, 6]
+	#  without a tree, the stack only holds the values
+	assert parser.parse('1;\n' * 1000, lambda nonterminal, children: None) is None
+
+
+def test_deep_tree_to_string(parser):
+	tree = parser.parse('1;\n' * 5000)
+	assert str(tree).count("NUM:'1'") == 5000
+
+
+def test_errors(lexer, parser):
+	#  syntax errors give the position of the unexpected token, in the format of the lexing errors
+	with pytest.raises(ValueError, match='^Syntax error: unexpected end of input at character EOF, line 1$'):
+		parser.parse('1;\n1 +')
+	with pytest.raises(ValueError, match="^Syntax error: unexpected PLUS '\\+' at character 5, line 0$"):
+		parser.parse('1 + + 2;')
+	with pytest.raises(ValueError, match="^Syntax error: unexpected NUM '22' at character 4, line 2$"):
+		parser.parse('1;\n2;\n(1 22);')
+	#  lexing errors use the same message as lex
+	message = lexer.lex('1 # 2;')[0][1]
+	assert message == 'No viable alternative at character 3, line 0'
+	with pytest.raises(ValueError, match=message):
+		parser.parse('1 # 2;')
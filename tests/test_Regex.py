@@ -0,0 +1,35 @@
+import pytest
+
+from lexer.Regex import CharRange, parse_regex
+from lexer.Lexer import Lexer
+
+
+def test_character_class_with_ranges_and_escapes():
+	regex = parse_regex('[a-cx\\-\\]]')
+	assert isinstance(regex, CharRange)
+	assert regex.ranges() == [(ord('a'), ord('c')), (ord('x'), ord('x')), (ord('-'), ord('-')), (ord(']'), ord(']'))]
+	assert str(parse_regex(str(regex))) == str(regex)
+
+
+def test_unicode_character_class():
+	lexer = Lexer([('SPACE', '\\ ', 'skip'), ('GREEK', '[α-ω]+')], compressRanges=True)
+	assert lexer.lex('αβ γ') == [('GREEK', 'αβ'), ('GREEK', 'γ')]
+	assert lexer.lexWithRecovery('αβ γ!') == (
+		[('GREEK', 'αβ'), ('GREEK', 'γ')], [(4, 0, 5, 'No viable alternative at character 5, line 0')])
+
+
+@pytest.mark.parametrize('regex', ['[]', 'a[]b'])
+def test_empty_character_class(regex):
+	with pytest.raises(ValueError, match='Empty character class'):
+		parse_regex(regex)
+
+
+@pytest.mark.parametrize('regex', ['[ab', '[a-', '[a-z', '[\\]'])
+def test_unterminated_character_class(regex):
+	with pytest.raises(ValueError, match='Unterminated character class'):
+		parse_regex(regex)
+
+
+def test_reversed_range():
+	with pytest.raises(ValueError, match='Invalid range'):
+		parse_regex('[z-a]')